@@ -4,74 +4,83 @@ Configuration management for Piper TTS Service.
 Centralizes all configuration options and provides validation.
 """
 
-import os
+import atexit
+import queue
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Literal
 import logging
+import logging.handlers
 
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-class ServiceConfig:
+
+@lru_cache(maxsize=None)
+def _ensure_dir(path: Path) -> None:
+    """Create a directory once per process, skipping the syscall if it exists."""
+    if not path.exists():
+        path.mkdir(parents=True, exist_ok=True)
+
+
+class ServiceConfig(BaseSettings):
     """Service configuration with environment variable support and validation."""
-    
-    def __init__(self):
-        # Server configuration
-        self.host = os.getenv("PIPER_HOST", "0.0.0.0")
-        self.port = int(os.getenv("PIPER_PORT", "9001"))
-        
-        # Model configuration  
-        self.models_dir = Path(os.getenv("PIPER_MODELS_DIR", "models/piper"))
-        self.default_voice = os.getenv("PIPER_DEFAULT_VOICE", "en_US-lessac-low")
-        self.max_text_length = int(os.getenv("PIPER_MAX_TEXT_LENGTH", "10000"))
-        
-        # Performance settings
-        self.max_concurrent_requests = int(os.getenv("PIPER_MAX_CONCURRENT", "10"))
-        self.model_cache_size = int(os.getenv("PIPER_MODEL_CACHE_SIZE", "5"))
-        
-        # Logging
-        self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
-        self.log_file = os.getenv("PIPER_LOG_FILE", "logs/piper-service.log")
-        
-        # Validation
-        self._validate()
-        
+
+    model_config = SettingsConfigDict(env_prefix="PIPER_", frozen=True, protected_namespaces=())
+
+    # Server configuration. Each worker process keeps its own voice models
+    # and WAV cache, so memory grows with the worker count.
+    host: str = "0.0.0.0"
+    port: int = Field(9001, ge=1, le=65535)
+    workers: int = Field(1, ge=1)
+
+    # Model configuration
+    models_dir: Path = Path("models/piper")
+    default_voice: str = "en_US-lessac-low"
+    max_text_length: int = Field(10000, ge=1)
+    quantize: bool = False
+
+    # Performance settings
+    max_concurrent_requests: int = Field(10, ge=1, validation_alias="PIPER_MAX_CONCURRENT")
+    model_cache_size: int = Field(5, ge=1)
+    wav_cache_mb: int = Field(64, ge=0)
+    phoneme_cache_mb: int = Field(8, ge=0)
+    execution_provider: Literal["cpu", "cuda", "coreml"] = Field("cpu", validation_alias="PIPER_EP")
+
+    # Logging
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = Field(
+        "INFO", validation_alias="LOG_LEVEL"
+    )
+    log_file: str = "logs/piper-service.log"
+
+    @field_validator("execution_provider", mode="before")
+    @classmethod
+    def _lower_provider(cls, value: Any) -> Any:
+        return value.lower() if isinstance(value, str) else value
+
+    @field_validator("log_level", mode="before")
+    @classmethod
+    def _upper_log_level(cls, value: Any) -> Any:
+        return value.upper() if isinstance(value, str) else value
+
+    def model_post_init(self, __context: Any) -> None:
         # Ensure required directories exist
-        self.models_dir.mkdir(parents=True, exist_ok=True)
-        Path(self.log_file).parent.mkdir(parents=True, exist_ok=True)
-    
-    def _validate(self):
-        """Validate configuration values."""
-        if self.port < 1 or self.port > 65535:
-            raise ValueError(f"Invalid port number: {self.port}")
-        
-        if self.max_text_length < 1:
-            raise ValueError(f"Invalid max text length: {self.max_text_length}")
-        
-        if self.max_concurrent_requests < 1:
-            raise ValueError(f"Invalid max concurrent requests: {self.max_concurrent_requests}")
-        
-        if self.model_cache_size < 1:
-            raise ValueError(f"Invalid model cache size: {self.model_cache_size}")
-        
-        valid_log_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
-        if self.log_level not in valid_log_levels:
-            raise ValueError(f"Invalid log level: {self.log_level}. Must be one of {valid_log_levels}")
-    
+        _ensure_dir(self.models_dir)
+        _ensure_dir(Path(self.log_file).parent)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary for logging/debugging."""
-        return {
-            'host': self.host,
-            'port': self.port,
-            'models_dir': str(self.models_dir),
-            'default_voice': self.default_voice,
-            'max_text_length': self.max_text_length,
-            'max_concurrent_requests': self.max_concurrent_requests,
-            'model_cache_size': self.model_cache_size,
-            'log_level': self.log_level,
-            'log_file': self.log_file
-        }
-
-
-# Extended voice catalog with more models
+        return self.model_dump(mode="json")
+
+
+@lru_cache(maxsize=1)
+def get_config() -> ServiceConfig:
+    """Get the service configuration, read from the environment once per process."""
+    return ServiceConfig()
+
+
+# Extended voice catalog with more models. An entry may also set
+# "quantized_url" to a prebuilt int8 model, used when PIPER_QUANTIZE is on.
 EXTENDED_VOICE_CATALOG = {
     # English (US) voices
     "en_US-lessac-medium": {
@@ -161,6 +170,10 @@ EXTENDED_VOICE_CATALOG = {
 }
 
 
+# Background listeners draining each configured logger's queue
+_log_listeners: Dict[str, logging.handlers.QueueListener] = {}
+
+
 def setup_logging(config: ServiceConfig) -> logging.Logger:
     """Setup logging configuration for the service."""
     logger = logging.getLogger("piper-service")
@@ -179,12 +192,27 @@ def setup_logging(config: ServiceConfig) -> logging.Logger:
     # File handler
     file_handler = logging.FileHandler(config.log_file)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
     
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    
+    # Handlers run on a background thread; logging calls only enqueue records
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    _log_listeners[logger.name] = listener
+    atexit.register(stop_logging)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     logger.propagate = False
     return logger
+
+
+def stop_logging() -> None:
+    """Flush queued log records and stop the background logging thread."""
+    listener = _log_listeners.pop("piper-service", None)
+    if listener is not None:
+        listener.stop()
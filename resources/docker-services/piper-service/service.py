@@ -5,23 +5,34 @@ A production-ready FastAPI service for text-to-speech using Piper TTS.
 This service converts the embedded Piper client library into a RESTful HTTP API.
 """
 
+from __future__ import annotations
+
 import asyncio
-import io
+import hashlib
 import os
 import logging
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, List, Any
-import urllib.request
-import wave
+from typing import TYPE_CHECKING, Optional, Dict, List, Any, AsyncIterator, Iterator, Tuple
 import json
 
+import aiofiles
+import cachetools
+import httpx
+import orjson
 from fastapi import FastAPI, HTTPException, Response, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-import piper
-import uvicorn
 
-from config import ServiceConfig, EXTENDED_VOICE_CATALOG, setup_logging
+from config import get_config, EXTENDED_VOICE_CATALOG, setup_logging, stop_logging
+
+# Piper pulls in ONNX Runtime and NumPy, so it and onnxruntime are imported
+# on first use rather than at module import
+if TYPE_CHECKING:
+    import piper
 
 
 # Request/Response models
@@ -30,6 +41,7 @@ class TTSRequest(BaseModel):
     text: str = Field(..., description="Text to convert to speech", min_length=1, max_length=10000)
     voice: Optional[str] = Field(None, description="Voice model to use (defaults to service default)")
     speed: Optional[float] = Field(1.0, description="Speech speed multiplier", ge=0.5, le=2.0)
+    stream: bool = Field(True, description="Stream audio as it is synthesized instead of returning a complete WAV")
 
 
 class VoiceInfo(BaseModel):
@@ -61,110 +73,531 @@ class DownloadVoiceRequest(BaseModel):
     quality: str = Field("medium", description="Quality (low/medium/high)")
 
 
+class VoiceModelCache(cachetools.LRUCache):
+    """LRU cache of loaded voices; evicted models are dropped so ORT frees their sessions."""
+
+    def popitem(self):
+        voice_name, voice_model = super().popitem()
+        logger.info("Evicted voice model: %s", voice_name)
+        return voice_name, voice_model
+
+    def clear(self):
+        # MutableMapping.clear() goes through popitem(); unloading every
+        # voice isn't an eviction, so delete them directly
+        for voice_name in list(self):
+            del self[voice_name]
+
+
 # Global state
-config = ServiceConfig()
-voice_models: Dict[str, piper.PiperVoice] = {}
+config = get_config()
+voice_models = VoiceModelCache(maxsize=config.model_cache_size)
 app = FastAPI(
     title="Piper TTS Service",
     description="HTTP API for Piper text-to-speech synthesis",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Setup logging
 logger = setup_logging(config)
 
+# Dedicated executors: synthesis is bounded by the concurrency limit, and
+# model loads get their own small pool so they never queue behind inference.
+# ONNX Runtime releases the GIL during session.run, so threads scale across
+# cores without duplicating model weights per process.
+TTS_POOL = ThreadPoolExecutor(
+    max_workers=config.max_concurrent_requests,
+    thread_name_prefix="piper-tts"
+)
+LOAD_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="piper-load")
+
 
 # Use extended voice catalog from config
 VOICE_CATALOG = EXTENDED_VOICE_CATALOG
 
+# Shared HTTP client for voice downloads, reusing connections across files.
+# Hugging Face serves model files through a redirect to its CDN.
+HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    follow_redirects=True,
+    timeout=httpx.Timeout(30.0, read=300.0),
+    limits=httpx.Limits(max_keepalive_connections=8)
+)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Model and config file paths per catalog voice, computed once
+VOICE_PATHS: Dict[str, tuple[Path, Path]] = {
+    name: (config.models_dir / f"{name}.onnx", config.models_dir / f"{name}.onnx.json")
+    for name in VOICE_CATALOG
+}
+
+# Synthesized WAVs keyed by (voice, speed, text) hash, bounded in bytes.
+# A single clip may take at most a quarter of the cache.
+WAV_CACHE: Optional[cachetools.LRUCache] = (
+    cachetools.LRUCache(maxsize=config.wav_cache_mb * 1024 * 1024, getsizeof=len)
+    if config.wav_cache_mb > 0 else None
+)
+WAV_CACHE_MAX_ITEM_BYTES = config.wav_cache_mb * 1024 * 1024 // 4
+
+# Each phoneme is a one-character str: up to ~80 bytes with its list slot
+PHONEME_BYTES = 80
+
+
+def phoneme_cache_size(sentences: tuple[List[str], ...]) -> int:
+    """Approximate memory held by a phoneme cache entry."""
+    return sum(len(phonemes) for phonemes in sentences) * PHONEME_BYTES
+
+
+# Phonemes per sentence keyed by (phoneme type, espeak voice, text), bounded
+# in bytes like the WAV cache. They depend only on the language, so voices
+# sharing one reuse the entries. Synthesis runs on pool threads, hence the lock.
+PHONEME_CACHE: Optional[cachetools.LRUCache] = (
+    cachetools.LRUCache(maxsize=config.phoneme_cache_mb * 1024 * 1024, getsizeof=phoneme_cache_size)
+    if config.phoneme_cache_mb > 0 else None
+)
+PHONEME_CACHE_MAX_ITEM_BYTES = config.phoneme_cache_mb * 1024 * 1024 // 4
+_phoneme_lock = threading.Lock()
+
+# In-flight model loads and downloads, keyed by voice name
+_loading: Dict[str, asyncio.Task[piper.PiperVoice]] = {}
+_downloading: Dict[str, asyncio.Task[tuple[str, str]]] = {}
+
+# Serialized /voices response, valid while the models directory mtime is
+# unchanged, and /health response keyed by the number of loaded models
+_voices_json: Optional[bytes] = None
+_voices_json_mtime: int = 0
+_health_json: Optional[tuple[int, bytes]] = None
+
+
+def invalidate_voices_cache() -> None:
+    """Force the next /voices request to rescan the models directory."""
+    global _voices_json
+    _voices_json = None
+
+
+async def download_file(url: str, path: Path) -> None:
+    """Stream a file to disk, moving it into place only once complete."""
+    partial_path = path.with_name(path.name + ".part")
+    logger.info("Downloading %s...", url)
+
+    async with HTTP_CLIENT.stream("GET", url) as response:
+        response.raise_for_status()
+        async with aiofiles.open(partial_path, "wb") as f:
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                await f.write(chunk)
+
+    os.replace(partial_path, path)
+    logger.info("Downloaded: %s", path)
+
 
 async def download_voice_model(voice_name: str) -> tuple[str, str]:
     """Download a voice model if it doesn't exist."""
+    # Concurrent downloads of a voice would write the same .part files, so
+    # they share one in-flight task, shielded like voice loads
+    task = _downloading.get(voice_name)
+    if task is None:
+        task = asyncio.create_task(_download_voice_model(voice_name))
+        _downloading[voice_name] = task
+        task.add_done_callback(lambda _: _downloading.pop(voice_name, None))
+
+    return await asyncio.shield(task)
+
+
+async def _download_voice_model(voice_name: str) -> tuple[str, str]:
     if voice_name not in VOICE_CATALOG:
         raise HTTPException(status_code=404, detail=f"Voice '{voice_name}' not found in catalog")
     
-    model_path = config.models_dir / f"{voice_name}.onnx"
-    config_path = config.models_dir / f"{voice_name}.onnx.json"
-    
-    if model_path.exists() and config_path.exists():
-        logger.info(f"Voice model already exists: {voice_name}")
-        return str(model_path), str(config_path)
-    
-    logger.info(f"Downloading voice model: {voice_name}")
+    model_path, config_path = VOICE_PATHS[voice_name]
     voice_info = VOICE_CATALOG[voice_name]
     base_url = voice_info["base_url"]
+
+    files = [(f"{base_url}/{model_path.name}", model_path), (f"{base_url}/{config_path.name}", config_path)]
+    if config.quantize and voice_info.get("quantized_url"):
+        files.append((voice_info["quantized_url"], quantized_model_path(model_path)))
+
+    missing = [(url, path) for url, path in files if not path.exists()]
+    if not missing:
+        logger.info("Voice model already exists: %s", voice_name)
+        return str(model_path), str(config_path)
+    
+    logger.info("Downloading voice model: %s", voice_name)
     
+    # Fetch all missing files concurrently over the shared client
+    downloads = [download_file(url, path) for url, path in missing]
+    results = await asyncio.gather(*downloads, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+
+    if errors:
+        logger.error("Failed to download voice model %s: %s", voice_name, errors[0])
+        # Clean up partial downloads
+        for _, path in missing:
+            partial_path = path.with_name(path.name + ".part")
+            if partial_path.exists():
+                partial_path.unlink()
+        raise HTTPException(status_code=500, detail=f"Failed to download voice model: {str(errors[0])}")
+
+    invalidate_voices_cache()
+    return str(model_path), str(config_path)
+
+
+# ONNX Runtime execution providers per PIPER_EP, in order of preference
+EXECUTION_PROVIDERS: Dict[str, List[Any]] = {
+    "cuda": [
+        ("CUDAExecutionProvider", {"device_id": 0, "arena_extend_strategy": "kSameAsRequested"}),
+        "CPUExecutionProvider"
+    ],
+    "coreml": ["CoreMLExecutionProvider", "CPUExecutionProvider"],
+    "cpu": ["CPUExecutionProvider"]
+}
+
+
+@lru_cache(maxsize=1)
+def session_providers() -> List[Any]:
+    """Requested execution providers supported by the installed onnxruntime build."""
+    import onnxruntime
+
+    available = set(onnxruntime.get_available_providers())
+    providers = [
+        provider for provider in EXECUTION_PROVIDERS[config.execution_provider]
+        if (provider[0] if isinstance(provider, tuple) else provider) in available
+    ]
+    if len(providers) < len(EXECUTION_PROVIDERS[config.execution_provider]):
+        logger.warning("Execution provider '%s' not fully available, using %s", config.execution_provider, providers)
+    return providers
+
+
+def quantized_model_path(model_path: Path) -> Path:
+    """Path of the int8-quantized variant of a voice model."""
+    return model_path.with_suffix(".int8.onnx")
+
+
+@lru_cache(maxsize=1)
+def quantization_tools() -> Optional[Tuple[Any, Any]]:
+    """onnxruntime's quantize_dynamic and QuantType, or None if they can't be imported."""
     try:
-        # Download model file
-        if not model_path.exists():
-            model_url = f"{base_url}/{voice_name}.onnx"
-            logger.info(f"Downloading model from {model_url}...")
-            urllib.request.urlretrieve(model_url, str(model_path))
-            logger.info(f"Model downloaded: {model_path}")
-        
-        # Download config file  
-        if not config_path.exists():
-            config_url = f"{base_url}/{voice_name}.onnx.json"
-            logger.info(f"Downloading config from {config_url}...")
-            urllib.request.urlretrieve(config_url, str(config_path))
-            logger.info(f"Config downloaded: {config_path}")
-            
-        return str(model_path), str(config_path)
-            
+        from onnxruntime.quantization import QuantType, quantize_dynamic
     except Exception as e:
-        logger.error(f"Failed to download voice model {voice_name}: {e}")
-        # Clean up partial downloads
-        for path in [model_path, config_path]:
-            if path.exists():
-                path.unlink()
-        raise HTTPException(status_code=500, detail=f"Failed to download voice model: {str(e)}")
+        # A mismatched onnx/onnxruntime pair fails here with AttributeError
+        # rather than ImportError, so catch both
+        logger.error("PIPER_QUANTIZE disabled, onnxruntime.quantization failed to import "
+                     "(check the onnx and onnxruntime versions): %r", e)
+        return None
+    return quantize_dynamic, QuantType
+
+
+def ensure_quantized_model(model_path: Path) -> Path:
+    """Quantize a voice model's weights to int8 once, caching the result on disk."""
+    quantized_path = quantized_model_path(model_path)
+    if quantized_path.exists():
+        return quantized_path
+
+    quantize_dynamic, QuantType = quantization_tools()
+
+    # Only MatMul/Gemm: quantized Convs become ConvInteger, which ORT's CPU
+    # kernels don't implement for int8 weights
+    logger.info("Quantizing %s to int8...", model_path.name)
+    partial_path = quantized_path.with_name(quantized_path.name + ".part")
+    try:
+        quantize_dynamic(
+            str(model_path),
+            str(partial_path),
+            op_types_to_quantize=["MatMul", "Gemm"],
+            weight_type=QuantType.QInt8
+        )
+        os.replace(partial_path, quantized_path)
+    finally:
+        # A failed run leaves a partial file that later attempts would trip over
+        partial_path.unlink(missing_ok=True)
+    logger.info("Quantized model saved: %s", quantized_path)
+    return quantized_path
+
+
+def optimized_model_path(model_path: Path) -> Optional[Path]:
+    """Path of the graph-optimized copy of a model for the providers in use.
+
+    Optimized graphs are provider-specific, so the name follows the
+    providers session_providers() resolved rather than the requested one;
+    a CPU-only fallback never writes a graph later runs load for CUDA.
+    The onnxruntime version is part of the name too, so an upgraded image
+    re-optimizes instead of loading a graph saved by another release.
+    CoreML compiles nodes into the session, which ORT can't serialize, so
+    there is no optimized copy for it.
+    """
+    import onnxruntime
+
+    names = [
+        (provider[0] if isinstance(provider, tuple) else provider)
+        .removesuffix("ExecutionProvider").lower()
+        for provider in session_providers()
+    ]
+    if "coreml" in names:
+        return None
+    return model_path.with_suffix(f".{'-'.join(names)}.ort{onnxruntime.__version__}.opt.onnx")
+
+
+def create_session(model_path: str, save_path: Optional[Path] = None):
+    """Create an ONNX Runtime session for a voice model.
+
+    When save_path is given, the optimized graph is written there. Saved
+    graphs stop at ORT_ENABLE_EXTENDED: ORT_ENABLE_ALL adds layout
+    transforms specific to the CPU they were built on. Sessions that serve
+    requests run at ORT_ENABLE_ALL, which on an already optimized graph
+    leaves only those quick layout passes.
+    """
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.enable_mem_pattern = True
+    if save_path is not None:
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        session_options.optimized_model_filepath = str(save_path)
+    else:
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    return onnxruntime.InferenceSession(
+        model_path,
+        sess_options=session_options,
+        providers=session_providers()
+    )
+
+
+def open_session(model_path: Path):
+    """Open a session for a model, using or writing its optimized copy."""
+    optimized_path = optimized_model_path(model_path)
+    if optimized_path is not None and optimized_path.exists():
+        try:
+            return create_session(str(optimized_path))
+        except Exception as e:
+            logger.warning("Discarding unusable optimized model %s: %s", optimized_path.name, e)
+            optimized_path.unlink(missing_ok=True)
+
+    if optimized_path is None:
+        return create_session(str(model_path))
+
+    # The saving session lacks the host-specific layout passes, so serve
+    # from a fresh session over the saved graph
+    save_path = optimized_path.with_name(optimized_path.name + ".part")
+    session = create_session(str(model_path), save_path=save_path)
+    if not save_path.exists():
+        return session
+    os.replace(save_path, optimized_path)
+    logger.info("Optimized model saved: %s", optimized_path)
+    return create_session(str(optimized_path))
+
+
+def load_piper_voice(model_path: str, config_path: str) -> piper.PiperVoice:
+    """Build a PiperVoice with our own ONNX Runtime session - runs in executor."""
+    from piper import PiperVoice
+    from piper.config import PiperConfig
+
+    with open(config_path, "r", encoding="utf-8") as config_file:
+        voice_config = PiperConfig.from_dict(json.load(config_file))
+
+    # One session per voice is shared by all synthesis threads; ORT's run() is thread-safe
+    if config.quantize and quantization_tools() is not None:
+        quantized_path = quantized_model_path(Path(model_path))
+        try:
+            quantized_path = ensure_quantized_model(Path(model_path))
+            return PiperVoice(session=open_session(quantized_path), config=voice_config)
+        except Exception as e:
+            # Drop the unusable int8 model so it isn't retried on every load
+            logger.warning("Quantized model %s unusable, using fp32: %s", quantized_path.name, e)
+            quantized_path.unlink(missing_ok=True)
+            optimized_path = optimized_model_path(quantized_path)
+            if optimized_path is not None:
+                optimized_path.unlink(missing_ok=True)
+
+    return PiperVoice(session=open_session(Path(model_path)), config=voice_config)
 
 
 async def load_voice_model(voice_name: str) -> piper.PiperVoice:
     """Load a voice model into memory."""
     if voice_name in voice_models:
         return voice_models[voice_name]
-    
+
+    # Coalesce concurrent requests for a cold voice onto one in-flight load.
+    # Waiters are shielded so a disconnecting client can't cancel it for others.
+    task = _loading.get(voice_name)
+    if task is None:
+        task = asyncio.create_task(_load_voice_model(voice_name))
+        _loading[voice_name] = task
+        task.add_done_callback(lambda _: _loading.pop(voice_name, None))
+
+    return await asyncio.shield(task)
+
+
+async def _load_voice_model(voice_name: str) -> piper.PiperVoice:
+    """Download (if needed) and load a voice model, caching the result."""
     try:
         # Download if needed
         model_path, config_path = await download_voice_model(voice_name)
-        
+
         # Load model in executor to avoid blocking
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         voice_model = await loop.run_in_executor(
-            None,
-            piper.PiperVoice.load,
+            LOAD_POOL,
+            load_piper_voice,
             model_path,
             config_path
         )
-        
+
         voice_models[voice_name] = voice_model
-        logger.info(f"Voice model loaded: {voice_name}")
+        logger.info("Voice model loaded: %s", voice_name)
         return voice_model
-        
+
     except Exception as e:
-        logger.error(f"Failed to load voice model {voice_name}: {e}")
+        logger.error("Failed to load voice model %s: %s", voice_name, e)
         raise HTTPException(status_code=500, detail=f"Failed to load voice model: {str(e)}")
 
 
-def synthesize_audio_sync(text: str, voice_model: piper.PiperVoice) -> bytes:
-    """Synchronous audio synthesis - runs in executor."""
-    wav_buffer = io.BytesIO()
-    
+# The final length of a streamed WAV isn't known up front, so the RIFF and
+# data chunk sizes are set to the maximum value. Decoders such as ffmpeg
+# treat this as "read until end of stream".
+WAV_STREAM_SIZE = 0xFFFFFFFF
+
+
+def wav_header(sample_rate: int, data_size: int = WAV_STREAM_SIZE) -> bytes:
+    """Build the 44-byte RIFF/WAVE header for 16-bit mono PCM.
+
+    The default data size marks a stream of unknown length.
+    """
+    riff_size = min(36 + data_size, WAV_STREAM_SIZE)
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_size
+    )
+
+
+def phonemize_cached(text: str, voice_model: piper.PiperVoice) -> tuple[List[str], ...]:
+    """Phonemes grouped by sentence, computed by eSpeak once per language and text."""
+    text = " ".join(text.split())
+    if PHONEME_CACHE is None:
+        return tuple(voice_model.phonemize(text))
+
+    key = (voice_model.config.phoneme_type, voice_model.config.espeak_voice, text)
+    with _phoneme_lock:
+        sentences = PHONEME_CACHE.get(key)
+    if sentences is None:
+        sentences = tuple(voice_model.phonemize(text))
+        # Long texts would evict many short, frequently repeated ones
+        if phoneme_cache_size(sentences) <= PHONEME_CACHE_MAX_ITEM_BYTES:
+            with _phoneme_lock:
+                PHONEME_CACHE[key] = sentences
+    return sentences
+
+
+def synthesize_chunks(
+    text: str,
+    voice_model: piper.PiperVoice,
+    speed: Optional[float] = None
+) -> Iterator[bytes]:
+    """Yield raw 16-bit PCM per sentence, at the requested speed."""
+    length_scale = voice_model.config.length_scale / (speed or 1.0)
+    for phonemes in phonemize_cached(text, voice_model):
+        yield voice_model.synthesize_ids_to_raw(
+            voice_model.phonemes_to_ids(phonemes),
+            length_scale=length_scale
+        )
+
+
+def wav_join(sample_rate: int, chunks: List[bytes]) -> bytes:
+    """Assemble a complete WAV from PCM chunks with a single copy.
+
+    Piper already returns int16 PCM, so the chunks go into the output
+    as-is, without per-sample conversion.
+    """
+    data_size = sum(map(len, chunks))
+    return b"".join([wav_header(sample_rate, data_size), *chunks])
+
+
+def synthesize_audio_sync(
+    text: str,
+    voice_model: piper.PiperVoice,
+    speed: Optional[float] = None
+) -> bytes:
+    """Synchronous audio synthesis of a complete WAV - runs in executor."""
+    chunks = list(synthesize_chunks(text, voice_model, speed))
+    return wav_join(voice_model.config.sample_rate, chunks)
+
+
+async def stream_audio(
+    text: str,
+    voice_model: piper.PiperVoice,
+    speed: Optional[float] = None,
+    cache_key: Optional[bytes] = None
+) -> AsyncIterator[bytes]:
+    """Yield a WAV header followed by PCM chunks as Piper produces them.
+
+    When a cache key is given, the finished WAV is stored in the WAV cache
+    as long as it stays small enough to be worth keeping.
+    """
+    sample_rate = voice_model.config.sample_rate
+    yield wav_header(sample_rate)
+
+    # Piper synthesizes one sentence per step; each step runs on the TTS pool
+    # so the event loop stays free between chunks
+    loop = asyncio.get_running_loop()
+    chunks = synthesize_chunks(text, voice_model, speed)
+    total_bytes = 0
+    parts: Optional[List[bytes]] = [] if cache_key is not None else None
+
     try:
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            # Configure WAV format parameters
-            wav_file.setnchannels(1)  # Mono audio
-            wav_file.setsampwidth(2)  # 16-bit samples
-            wav_file.setframerate(voice_model.config.sample_rate)  # Use model's sample rate
-            
-            # Generate audio using the correct Piper API
-            voice_model.synthesize(text, wav_file)
-        
-        return wav_buffer.getvalue()
-        
-    finally:
-        wav_buffer.close()
+        while True:
+            chunk = await loop.run_in_executor(TTS_POOL, next, chunks, None)
+            if chunk is None:
+                break
+            total_bytes += len(chunk)
+            if parts is not None:
+                if total_bytes > WAV_CACHE_MAX_ITEM_BYTES:
+                    parts = None  # Too long to be worth caching
+                else:
+                    parts.append(chunk)
+            yield chunk
+    except Exception as e:
+        logger.error("TTS stream failed after %s bytes: %s", total_bytes, e)
+        raise
+
+    if parts is not None:
+        WAV_CACHE[cache_key] = wav_join(sample_rate, parts)
+
+    logger.info("TTS completed: %s bytes streamed", total_bytes)
+
+
+def wav_response(audio_data: bytes) -> Response:
+    """Wrap a complete WAV in a response."""
+    return Response(
+        content=audio_data,
+        media_type="audio/wav",
+        headers={
+            "Content-Disposition": "inline; filename=\"speech.wav\"",
+            "Content-Length": str(len(audio_data))
+        }
+    )
+
+
+def wav_cache_key(text: str, voice_name: str, speed: Optional[float]) -> bytes:
+    """Content-addressed key for a synthesized WAV."""
+    return hashlib.blake2b(f"{voice_name}|{speed}|{text}".encode(), digest_size=16).digest()
+
+
+def scan_voices() -> Dict[str, tuple[Optional[float], bool]]:
+    """Map each catalog voice to (file_size_mb, available) from one directory scan."""
+    with os.scandir(config.models_dir) as entries:
+        stats = {
+            entry.name: entry.stat()
+            for entry in entries
+            if entry.name.endswith((".onnx", ".onnx.json"))
+        }
+
+    voices = {}
+    for voice_name, (model_path, config_path) in VOICE_PATHS.items():
+        model_stat = stats.get(model_path.name)
+        available = model_stat is not None and config_path.name in stats
+        file_size_mb = round(model_stat.st_size / (1024 * 1024), 1) if available else None
+        voices[voice_name] = (file_size_mb, available)
+    return voices
 
 
 # API Endpoints
@@ -172,88 +605,114 @@ def synthesize_audio_sync(text: str, voice_model: piper.PiperVoice) -> bytes:
 @app.post("/tts", response_class=Response)
 async def text_to_speech(request: TTSRequest) -> Response:
     """
-    Convert text to speech and return WAV audio data.
-    
-    Returns audio/wav with the synthesized speech.
+    Convert text to speech and stream WAV audio data.
+
+    Returns audio/wav with the synthesized speech, sent sentence by sentence
+    as Piper produces it. With stream=false the complete WAV is returned
+    with exact chunk sizes and a Content-Length. Repeated requests are served
+    from the WAV cache as complete WAVs.
     """
     try:
         voice_name = request.voice or config.default_voice
-        logger.info(f"TTS request: '{request.text[:50]}...' using voice '{voice_name}'")
-        
-        # Load voice model
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("TTS request: '%s...' using voice '%s'", request.text[:50], voice_name)
+
+        cache_key = None
+        if WAV_CACHE is not None:
+            cache_key = wav_cache_key(request.text, voice_name, request.speed)
+            audio_data = WAV_CACHE.get(cache_key)
+            if audio_data is not None:
+                logger.info("TTS cache hit: %s bytes", len(audio_data))
+                return wav_response(audio_data)
+
+        # Load voice model before streaming so load failures still return 500
         voice_model = await load_voice_model(voice_name)
-        
-        # Generate audio in executor
-        loop = asyncio.get_event_loop()
-        audio_data = await loop.run_in_executor(
-            None,
-            synthesize_audio_sync,
-            request.text,
-            voice_model
-        )
-        
-        logger.info(f"TTS completed: {len(audio_data)} bytes generated")
-        
-        return Response(
-            content=audio_data,
+
+        if not request.stream:
+            loop = asyncio.get_running_loop()
+            audio_data = await loop.run_in_executor(
+                TTS_POOL,
+                synthesize_audio_sync,
+                request.text,
+                voice_model,
+                request.speed
+            )
+
+            logger.info("TTS completed: %s bytes generated", len(audio_data))
+
+            if cache_key is not None and len(audio_data) <= WAV_CACHE_MAX_ITEM_BYTES:
+                WAV_CACHE[cache_key] = audio_data
+            return wav_response(audio_data)
+
+        return StreamingResponse(
+            stream_audio(request.text, voice_model, request.speed, cache_key),
             media_type="audio/wav",
             headers={
-                "Content-Disposition": "inline; filename=\"speech.wav\"",
-                "Content-Length": str(len(audio_data))
+                "Content-Disposition": "inline; filename=\"speech.wav\""
             }
         )
         
     except Exception as e:
-        logger.error(f"TTS request failed: {e}")
+        logger.error("TTS request failed: %s", e)
         raise HTTPException(status_code=500, detail=f"TTS generation failed: {str(e)}")
 
 
 @app.get("/voices", response_model=List[VoiceInfo])
-async def list_voices() -> List[VoiceInfo]:
+async def list_voices() -> Response:
     """
     List all available voice models.
     
     Returns information about voices in the catalog and their availability.
     """
-    voices = []
-    
-    for voice_name, info in VOICE_CATALOG.items():
-        model_path = config.models_dir / f"{voice_name}.onnx"
-        config_path = config.models_dir / f"{voice_name}.onnx.json"
-        
-        available = model_path.exists() and config_path.exists()
-        file_size_mb = None
+    global _voices_json, _voices_json_mtime
+
+    # Rebuild the response only when the models directory has changed, with
+    # the scan off the event loop since a cold scan stats every model file
+    mtime = os.stat(config.models_dir).st_mtime_ns
+    if _voices_json is None or mtime != _voices_json_mtime:
+        availability = await asyncio.to_thread(scan_voices)
+        voices = []
         
-        if available and model_path.exists():
-            file_size_mb = round(model_path.stat().st_size / (1024 * 1024), 1)
-        
-        voices.append(VoiceInfo(
-            name=voice_name,
-            language=info["language"],
-            speaker=info["speaker"],
-            quality=info["quality"],
-            sample_rate=info["sample_rate"],
-            gender=info["gender"],
-            file_size_mb=file_size_mb,
-            available=available
-        ))
-    
-    return voices
+        for voice_name, info in VOICE_CATALOG.items():
+            file_size_mb, available = availability[voice_name]
+            
+            voices.append(VoiceInfo(
+                name=voice_name,
+                language=info["language"],
+                speaker=info["speaker"],
+                quality=info["quality"],
+                sample_rate=info["sample_rate"],
+                gender=info["gender"],
+                file_size_mb=file_size_mb,
+                available=available
+            ).model_dump())
+
+        _voices_json = orjson.dumps(voices)
+        _voices_json_mtime = mtime
+
+    return Response(content=_voices_json, media_type="application/json")
 
 
 @app.get("/health", response_model=HealthResponse)
-async def health_check() -> HealthResponse:
+async def health_check() -> Response:
     """
     Service health check.
     
     Returns service status and loaded model information.
     """
-    return HealthResponse(
-        status="healthy",
-        voice_models_loaded=len(voice_models),
-        default_voice=config.default_voice,
-        models_directory=str(config.models_dir)
-    )
+    global _health_json
+
+    # Only the number of loaded models changes at runtime
+    loaded = len(voice_models)
+    if _health_json is None or _health_json[0] != loaded:
+        _health_json = (loaded, orjson.dumps(HealthResponse(
+            status="healthy",
+            voice_models_loaded=loaded,
+            default_voice=config.default_voice,
+            models_directory=str(config.models_dir)
+        ).model_dump()))
+
+    return Response(content=_health_json[1], media_type="application/json")
 
 
 @app.post("/download-voice")
@@ -268,8 +727,7 @@ async def download_voice(request: DownloadVoiceRequest, background_tasks: Backgr
     if voice_name not in VOICE_CATALOG:
         raise HTTPException(status_code=404, detail=f"Voice '{voice_name}' not found in catalog")
     
-    model_path = config.models_dir / f"{voice_name}.onnx"
-    config_path = config.models_dir / f"{voice_name}.onnx.json"
+    model_path, config_path = VOICE_PATHS[voice_name]
     
     if model_path.exists() and config_path.exists():
         return {
@@ -292,15 +750,15 @@ async def download_voice(request: DownloadVoiceRequest, background_tasks: Backgr
 async def startup_event():
     """Initialize the service on startup."""
     logger.info("Starting Piper TTS Service...")
-    logger.info(f"Models directory: {config.models_dir}")
-    logger.info(f"Default voice: {config.default_voice}")
+    logger.info("Models directory: %s", config.models_dir)
+    logger.info("Default voice: %s", config.default_voice)
     
     # Pre-load default voice model
     try:
         await load_voice_model(config.default_voice)
         logger.info("Default voice model loaded successfully")
     except Exception as e:
-        logger.warning(f"Failed to pre-load default voice: {e}")
+        logger.warning("Failed to pre-load default voice: %s", e)
     
     logger.info("Piper TTS Service started successfully")
 
@@ -312,15 +770,24 @@ async def shutdown_event():
     
     # Clear loaded models to free memory
     voice_models.clear()
+    await HTTP_CLIENT.aclose()
+    TTS_POOL.shutdown(wait=False, cancel_futures=True)
+    LOAD_POOL.shutdown(wait=False, cancel_futures=True)
     
     logger.info("Piper TTS Service shut down")
+    stop_logging()
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "service:app",
         host=config.host,
         port=config.port,
         log_level=config.log_level.lower(),
+        loop="uvloop",
+        http="httptools",
+        workers=config.workers,
         reload=False
     )
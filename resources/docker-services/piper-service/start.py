@@ -17,16 +17,15 @@ sys.path.insert(0, str(service_dir))
 def main():
     """Main startup function."""
     try:
-        from config import ServiceConfig, setup_logging
-        from service import app
+        from config import get_config, setup_logging
         import uvicorn
         
         # Load configuration
-        config = ServiceConfig()
+        config = get_config()
         logger = setup_logging(config)
         
         logger.info("Starting Piper TTS Service...")
-        logger.info(f"Configuration: {config.to_dict()}")
+        logger.info("Configuration: %s", config.to_dict())
         
         # Start the server
         uvicorn.run(
@@ -34,6 +33,9 @@ def main():
             host=config.host,
             port=config.port,
             log_level=config.log_level.lower(),
+            loop="uvloop",
+            http="httptools",
+            workers=config.workers,
             reload=False,
             access_log=True
         )
@@ -3,30 +3,55 @@ Configuration management for Whisper service
 Simplified version for standalone operation
 """
 
-import os
-from typing import Dict, Any
-from pydantic import BaseModel
+from functools import lru_cache
+from typing import Literal, Optional
 
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-class WhisperConfig(BaseModel):
-    """Whisper transcription configuration"""
+
+class WhisperSettings(BaseSettings):
+    """Whisper service settings, read from WHISPER_* environment variables"""
+
+    model_config = SettingsConfigDict(env_prefix="WHISPER_", frozen=True, protected_namespaces=())
+
+    # Server. Each worker process loads its own model; when unset, one
+    # worker runs on GPU and CPU hosts get one per cpu_threads cores.
+    host: str = "0.0.0.0"
+    port: int = 9000
+    workers: Optional[int] = Field(None, ge=1)
+    cpu_threads: int = Field(4, ge=1)
+
+    # Model. compute_type defaults per device when unset (see service.py)
+    model_size: str = "small"
+    compute_type: Optional[str] = None
+
+    # Seconds without requests before GPU weights move to host memory (0 = never)
+    idle_seconds: int = Field(300, ge=0)
+
+    # Largest raw audio body accepted by /asr/raw, in megabytes
+    max_body_mb: int = Field(512, ge=1)
+
+    # transformers backend (GPU only): chunked long-form audio decoded in
+    # batches, plus optional speculative decoding in which the assistant
+    # drafts tokens that the target model verifies. compile uses a static
+    # KV cache and torch.compile, warmed up at startup.
+    backend: Literal["faster-whisper", "transformers"] = "faster-whisper"
+    batch_size: int = Field(16, ge=1, validation_alias="WHISPER_BATCH")
+    chunk_length_s: int = Field(30, ge=1, le=30)
+    compile: bool = False
+    speculative: bool = False
+    hf_model: str = "openai/whisper-large-v3"
+    assistant_model: str = "distil-whisper/distil-large-v3"
+
+    # Transcription
     beam_size: int = 5
     temperature: float = 0.0
     no_speech_threshold: float = 0.6
     condition_on_previous_text: bool = True
 
 
-class Settings:
-    """Application settings"""
-    
-    def __init__(self):
-        self.whisper_config = WhisperConfig()
-    
-    def get_whisper_config(self) -> Dict[str, Any]:
-        """Get Whisper configuration as dictionary"""
-        return self.whisper_config.model_dump()
-
-
-def get_settings() -> Settings:
-    """Get application settings instance"""
-    return Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> WhisperSettings:
+    """Get application settings, read from the environment once per process"""
+    return WhisperSettings()
@@ -0,0 +1,470 @@
+﻿"""
+HuggingFace transformers backend for Whisper service
+Alternative to faster-whisper's WhisperModel for batched long-form
+transcription and speculative decoding, returning the same shapes.
+With word timestamps, segments are rebuilt from the words at sentence ends
+and pauses, so their boundaries can differ from faster-whisper's.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from faster_whisper import decode_audio
+from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+
+from logger import get_logger
+
+logger = get_logger('whisper-service')
+
+SAMPLE_RATE = 16000
+
+# Clips up to one Whisper window are decoded with a single generate call
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+# Decoder steps per 30 second window when the KV cache is static. Whisper's
+# decoder context is 448 tokens; this leaves room for an initial prompt,
+# and longer prompts lower the limit per request.
+STATIC_CACHE_NEW_TOKENS = 224
+
+# Decoder start tokens after a prompt: <|startoftranscript|>, language, task
+# and <|notimestamps|>
+START_TOKENS = 4
+
+# Word-timestamped output is split into segments after words ending a
+# sentence, or where the gap before the next word is at least this long
+SENTENCE_ENDINGS = (".", "?", "!", "。", "？", "！")
+SEGMENT_PAUSE_S = 1.0
+
+
+@dataclass
+class Word:
+    """Word-level timestamp, shaped like faster-whisper's Word"""
+    start: float
+    end: float
+    word: str
+    probability: Optional[float] = None
+
+
+@dataclass
+class Segment:
+    """Transcribed segment, shaped like faster-whisper's Segment"""
+    id: int
+    start: float
+    end: float
+    text: str
+    words: Optional[List[Word]] = None
+
+
+@dataclass
+class TranscriptionInfo:
+    """Transcription metadata, shaped like faster-whisper's TranscriptionInfo"""
+    language: Optional[str]
+    language_probability: Optional[float]
+    duration: float
+
+
+class HFWhisperModel:
+    """Whisper on transformers, returning (segments, info) like faster-whisper
+
+    Long audio is split into chunk_length_s windows that are decoded
+    batch_size at a time. Attention runs through PyTorch's
+    scaled_dot_product_attention kernels.
+
+    With an assistant model, generation uses speculative decoding: the small
+    assistant drafts tokens and the target model verifies them in a single
+    forward pass, which keeps the target's output unchanged. Speculative
+    decoding works on one sequence at a time, so it forces batch_size to 1
+    and greedy search in place of beam search.
+
+    With compile, the decoder uses a static KV cache and the forward pass
+    is compiled with CUDA graphs. The encoder, which generate() calls on
+    its own, is compiled the same way; it always sees a fixed 30 second
+    log-mel per window, so one captured graph per batch size replays for
+    every batch. Warmup decodes with warmup_options, the transcribe()
+    options requests will use, and captures the full batch size and the
+    powers of two below it; other partial batch sizes and options are
+    captured when first seen. This doesn't combine with an assistant.
+
+    Clips that fit in one 30 second window skip the pipeline. Their log-mel
+    features are computed once and shared by language detection and
+    generation. prepare() computes them off the model thread, so one
+    request's features are built while another is being decoded. On CUDA
+    they are staged in a pinned host buffer and uploaded on a side stream,
+    which keeps the copy from waiting behind the model's kernels.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        device: str = "cuda",
+        assistant_id: Optional[str] = None,
+        batch_size: int = 1,
+        chunk_length_s: int = 30,
+        compile: bool = False,
+        warmup_options: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.device = device
+        self.torch_dtype = torch.float16 if device == "cuda" else torch.float32
+        self.batch_size = 1 if assistant_id else batch_size
+        self.chunk_length_s = chunk_length_s
+
+        logger.info("Loading %s with transformers on %s", model_id, device)
+        self.model = AutoModelForSpeechSeq2Seq.from_pretrained(
+            model_id,
+            torch_dtype=self.torch_dtype,
+            use_safetensors=True,
+            attn_implementation="sdpa",
+        ).to(device)
+        self.processor = AutoProcessor.from_pretrained(model_id)
+
+        self._assistant_kwargs: Dict[str, Any] = {}
+        if assistant_id:
+            logger.info("Loading assistant model %s for speculative decoding", assistant_id)
+            assistant = AutoModelForSpeechSeq2Seq.from_pretrained(
+                assistant_id,
+                torch_dtype=self.torch_dtype,
+                use_safetensors=True,
+                attn_implementation="sdpa",
+            ).to(device)
+            self._assistant_kwargs["assistant_model"] = assistant
+
+        if compile and assistant_id:
+            logger.warning("torch.compile is not used with speculative decoding")
+            compile = False
+        self._static_cache = compile
+        if compile:
+            # The pipeline copies the generation config when it is built
+            self._use_static_cache()
+
+        self.pipe = pipeline(
+            "automatic-speech-recognition",
+            model=self.model,
+            tokenizer=self.processor.tokenizer,
+            feature_extractor=self.processor.feature_extractor,
+            torch_dtype=self.torch_dtype,
+            device=device,
+            generate_kwargs=self._assistant_kwargs,
+        )
+
+        # Pinned staging buffer for uploading log-mel features; prepare()
+        # runs on request threads, so uploads take turns with it
+        self._pinned: Optional[torch.Tensor] = None
+        if device == "cuda":
+            feature_extractor = self.processor.feature_extractor
+            shape = (1, feature_extractor.feature_size, feature_extractor.nb_max_frames)
+            self._pinned = torch.empty(shape, dtype=self.torch_dtype, pin_memory=True)
+            self._upload_lock = threading.Lock()
+            self._upload_stream = torch.cuda.Stream(device=device)
+
+        # Language tokens ("<|en|>") and their ids for detection
+        lang_to_id = self.model.generation_config.lang_to_id
+        self._languages = [token[2:-2] for token in lang_to_id]
+        self._language_ids = torch.tensor(list(lang_to_id.values()), device=device)
+
+        if compile:
+            self._compile(warmup_options or {})
+
+    def _use_static_cache(self) -> None:
+        """Decode with a fixed-size KV cache so compiled shapes don't change per step"""
+        generation_config = self.model.generation_config
+        generation_config.cache_implementation = "static"
+        generation_config.max_new_tokens = STATIC_CACHE_NEW_TOKENS
+
+    def _compile(self, warmup_options: Dict[str, Any]) -> None:
+        """Compile the encoder and decoder and warm them up with request options"""
+        logger.info("Compiling model with a static KV cache...")
+        # Not fullgraph: word timestamps need attention outputs, which go
+        # through code dynamo can't trace, so that path has graph breaks
+        self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead")
+        encoder = self.model.get_encoder()
+        encoder.forward = torch.compile(encoder.forward, mode="reduce-overhead")
+
+        # The first call compiles and the second records the CUDA graphs,
+        # so the first request doesn't pay for either. No language is given
+        # to transcribe, so language detection is warmed up too. The
+        # pipeline, used for long-form and timestamped output, runs with
+        # both kinds of timestamps at the full batch size and at powers of
+        # two below it, since the last batch of a file is usually only
+        # partly full and each batch shape is captured separately. Other
+        # sizes are captured when first seen, which keeps startup short.
+        silence = np.zeros(WINDOW_SAMPLES, dtype=np.float32)
+        window = {"raw": silence, "sampling_rate": SAMPLE_RATE}
+        generate_kwargs = {
+            "task": "transcribe",
+            "language": "en",
+            **self._decoding_kwargs(
+                warmup_options.get("beam_size", 1), warmup_options.get("temperature", 0.0)
+            ),
+        }
+        batch_sizes = sorted({self.batch_size} | {1 << i for i in range(self.batch_size.bit_length())})
+        # Each batch size and timestamp mode recompiles the forward; past
+        # dynamo's default limit of 8, new shapes would silently run eagerly
+        torch._dynamo.config.cache_size_limit = max(
+            torch._dynamo.config.cache_size_limit, 16 * len(batch_sizes)
+        )
+        for _ in range(2):
+            segments, _info = self.transcribe(silence, **warmup_options)
+            list(segments)
+            for batch_size in batch_sizes:
+                for return_timestamps in (True, "word"):
+                    # The pipeline pops the audio out of each input dict
+                    windows = [dict(window) for _ in range(batch_size)]
+                    self._run_pipeline(windows, return_timestamps, generate_kwargs)
+        logger.info("Model compiled")
+
+    def transcribe(
+        self,
+        audio: Union[str, BinaryIO, np.ndarray],
+        task: str = "transcribe",
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        word_timestamps: bool = False,
+        features: Optional[torch.Tensor] = None,
+        beam_size: int = 1,
+        temperature: Union[float, Sequence[float]] = 0.0,
+        **kwargs: Any,
+    ) -> Tuple[Iterator[Segment], TranscriptionInfo]:
+        """Transcribe audio with faster-whisper's decoding options
+
+        beam_size and temperature map onto generate(). The remaining
+        options (best_of, the compression, log-prob and no-speech
+        thresholds, condition_on_previous_text) drive faster-whisper's
+        temperature fallback and conditioning between sequentially decoded
+        windows, which batched chunks don't have, so they are ignored.
+        features, from prepare(), saves computing them on the model thread.
+        """
+        if not isinstance(audio, np.ndarray):
+            audio = decode_audio(audio, sampling_rate=SAMPLE_RATE)
+        duration = len(audio) / SAMPLE_RATE
+        short_form = self._is_short_form(audio, word_timestamps)
+
+        if features is None and (short_form or language is None):
+            features = self._features(audio)
+
+        language_probability = None
+        if language is None:
+            language, language_probability = self._detect_language(features)
+
+        generate_kwargs = {
+            "task": task,
+            "language": language,
+            **self._decoding_kwargs(beam_size, temperature),
+        }
+        if initial_prompt:
+            generate_kwargs.update(self._prompt_kwargs(initial_prompt))
+
+        info = TranscriptionInfo(
+            language=language,
+            language_probability=language_probability,
+            duration=duration,
+        )
+
+        if short_form:
+            return iter(self._generate_segments(features, generate_kwargs, duration)), info
+
+        result = self._run_pipeline(
+            {"raw": audio, "sampling_rate": SAMPLE_RATE},
+            "word" if word_timestamps else True,
+            generate_kwargs,
+        )
+        return iter(self._segments(result, duration, word_timestamps)), info
+
+    def _decoding_kwargs(
+        self, beam_size: int, temperature: Union[float, Sequence[float]]
+    ) -> Dict[str, Any]:
+        """generate() arguments for faster-whisper's beam_size and temperature"""
+        kwargs: Dict[str, Any] = {}
+        # Assisted generation only verifies drafts for a single beam
+        if beam_size > 1 and not self._assistant_kwargs:
+            kwargs["num_beams"] = beam_size
+        # Whisper's generate() samples above zero; a sequence lists the
+        # fallback temperatures
+        if not isinstance(temperature, (int, float)):
+            kwargs["temperature"] = tuple(temperature)
+        elif temperature > 0:
+            kwargs["temperature"] = temperature
+        return kwargs
+
+    def _prompt_kwargs(self, initial_prompt: str) -> Dict[str, Any]:
+        """generate() arguments for an initial prompt that fit the decoder context
+
+        Like OpenAI's Whisper, the prompt keeps its last tokens within half
+        the context. With the static cache, max_new_tokens shrinks so the
+        prompt, the start tokens and the output all fit in the cache.
+        """
+        max_positions = self.model.config.max_target_positions
+        prompt_ids = self.processor.get_prompt_ids(initial_prompt)
+        if len(prompt_ids) > max_positions // 2:
+            # The first token is <|startofprev|>
+            prompt_ids = np.concatenate([prompt_ids[:1], prompt_ids[1 - max_positions // 2:]])
+
+        kwargs: Dict[str, Any] = {"prompt_ids": torch.from_numpy(prompt_ids).to(self.device)}
+        if self._static_cache:
+            kwargs["max_new_tokens"] = min(
+                STATIC_CACHE_NEW_TOKENS, max_positions - len(prompt_ids) - START_TOKENS
+            )
+        return kwargs
+
+    def _run_pipeline(
+        self,
+        inputs: Union[Dict[str, Any], List[Dict[str, Any]]],
+        return_timestamps: Union[bool, str],
+        generate_kwargs: Dict[str, Any],
+    ) -> Any:
+        """Chunk the audio into windows and decode them batch_size at a time"""
+        with torch.inference_mode():
+            return self.pipe(
+                inputs,
+                chunk_length_s=self.chunk_length_s,
+                batch_size=self.batch_size,
+                return_timestamps=return_timestamps,
+                generate_kwargs=generate_kwargs,
+            )
+
+    def prepare(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        word_timestamps: bool = False,
+    ) -> Optional[torch.Tensor]:
+        """Features transcribe() needs for this audio, or None; thread-safe
+
+        Meant to run on the request's thread before the model call is queued.
+        """
+        if self._is_short_form(audio, word_timestamps) or language is None:
+            return self._features(audio)
+        return None
+
+    def detect_language(
+        self,
+        audio: Union[str, BinaryIO, np.ndarray],
+        features: Optional[torch.Tensor] = None,
+    ) -> Tuple[str, float]:
+        """Detect the language of the first 30 seconds without transcribing"""
+        if features is None:
+            if not isinstance(audio, np.ndarray):
+                audio = decode_audio(audio, sampling_rate=SAMPLE_RATE)
+            features = self._features(audio)
+        return self._detect_language(features)
+
+    @staticmethod
+    def _is_short_form(audio: np.ndarray, word_timestamps: bool) -> bool:
+        """Whether the audio is decoded with one generate call instead of the pipeline"""
+        return len(audio) <= WINDOW_SAMPLES and not word_timestamps
+
+    def _features(self, audio: np.ndarray) -> torch.Tensor:
+        """Log-mel features of the first 30 seconds, on the model's device"""
+        features = self.processor.feature_extractor(
+            audio[:WINDOW_SAMPLES], sampling_rate=SAMPLE_RATE, return_tensors="np"
+        ).input_features
+        if self._pinned is None:
+            return torch.from_numpy(features).to(self.device, dtype=self.torch_dtype)
+
+        with self._upload_lock:
+            self._pinned.copy_(torch.from_numpy(features))
+            with torch.cuda.stream(self._upload_stream):
+                uploaded = self._pinned.to(self.device, non_blocking=True)
+            # The buffer is reused once the copy lands; waiting here blocks
+            # only this thread, not the model's stream
+            self._upload_stream.synchronize()
+
+        # The model runs on the default stream, possibly from another thread
+        uploaded.record_stream(torch.cuda.default_stream(self.device))
+        return uploaded
+
+    def _generate_segments(
+        self, features: torch.Tensor, generate_kwargs: Dict[str, Any], duration: float
+    ) -> List[Segment]:
+        """Decode one window with generate and split it on timestamp tokens"""
+        with torch.inference_mode():
+            tokens = self.model.generate(
+                features,
+                return_timestamps=True,
+                **self._assistant_kwargs,
+                **generate_kwargs,
+            )
+
+        decoded = self.processor.tokenizer.decode(
+            tokens[0], skip_special_tokens=True, output_offsets=True
+        )
+        offsets = decoded.get("offsets") or [
+            {"text": decoded["text"], "timestamp": (0.0, duration)}
+        ]
+        return [
+            Segment(
+                id=i,
+                start=offset["timestamp"][0] or 0.0,
+                end=min(offset["timestamp"][1] or duration, duration),
+                text=offset["text"],
+            )
+            for i, offset in enumerate(offsets)
+            if offset["text"].strip()
+        ]
+
+    def _segments(self, result: Any, duration: float, word_timestamps: bool) -> List[Segment]:
+        """Convert pipeline output chunks to segments"""
+        chunks = result.get("chunks") or []
+        if not word_timestamps:
+            return [
+                Segment(
+                    id=i,
+                    start=chunk["timestamp"][0] or 0.0,
+                    end=chunk["timestamp"][1] or duration,
+                    text=chunk["text"],
+                )
+                for i, chunk in enumerate(chunks)
+            ]
+
+        # Word timestamps come back as one chunk per word
+        words = [
+            Word(
+                start=chunk["timestamp"][0] or 0.0,
+                end=chunk["timestamp"][1] or duration,
+                word=chunk["text"],
+            )
+            for chunk in chunks
+        ]
+        # The pipeline merges its windows into one run of words, so segments
+        # are split again at sentence ends and pauses
+        groups: List[List[Word]] = []
+        for word in words:
+            if groups:
+                last = groups[-1][-1]
+                if (
+                    not last.word.rstrip().endswith(SENTENCE_ENDINGS)
+                    and word.start - last.end < SEGMENT_PAUSE_S
+                ):
+                    groups[-1].append(word)
+                    continue
+            groups.append([word])
+
+        return [
+            Segment(
+                id=i,
+                start=group[0].start,
+                end=group[-1].end,
+                text="".join(word.word for word in group),
+                words=group,
+            )
+            for i, group in enumerate(groups)
+        ]
+
+    def _detect_language(self, features: torch.Tensor) -> Tuple[str, float]:
+        """Detect the language from the features of the first 30 seconds"""
+        decoder_input_ids = torch.tensor(
+            [[self.model.generation_config.decoder_start_token_id]], device=self.device
+        )
+
+        with torch.inference_mode():
+            # One decoder step needs no cache, and building one breaks the
+            # compiled graph on older transformers
+            logits = self.model(
+                input_features=features, decoder_input_ids=decoder_input_ids, use_cache=False
+            ).logits[0, -1]
+
+        probs = logits[self._language_ids].float().softmax(-1)
+        best = int(probs.argmax())
+        return self._languages[best], float(probs[best])
@@ -3,9 +3,16 @@ Logging configuration for Whisper service
 Simplified version for standalone operation
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
-from typing import Optional
+import queue
+from typing import Dict, Optional
+
+
+# Background listeners draining each configured logger's queue
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
 
 
 def get_logger(name: str = "whisper-service") -> logging.Logger:
@@ -32,7 +39,23 @@ def get_logger(name: str = "whisper-service") -> logging.Logger:
     )
     console_handler.setFormatter(formatter)
     
+    # Console output runs on a background thread; logging calls only enqueue records
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    _listeners[name] = listener
+    atexit.register(stop_logger, name)
+    
     # Add handler to logger
-    logger.addHandler(console_handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     return logger
+
+
+def stop_logger(name: str = "whisper-service") -> None:
+    """Flush queued log records and stop the logger's background thread"""
+    listener = _listeners.pop(name, None)
+    if listener is not None:
+        listener.stop()
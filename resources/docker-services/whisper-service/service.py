@@ -3,20 +3,37 @@ Standalone Whisper Service with GPU Acceleration
 Production-ready FastAPI service for speech recognition
 """
 
+import asyncio
+import functools
+import io
+import itertools
+import json
 import os
 import tempfile
-from typing import Optional, Literal, Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterable, Optional, Literal, Dict, Any, List, Tuple
+import ctranslate2
 import torch
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query
-from faster_whisper import WhisperModel
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+import numpy as np
+from faster_whisper import WhisperModel, decode_audio
 import uvicorn
-from dotenv import load_dotenv
+from dotenv import dotenv_values, load_dotenv
+from pydantic import ValidationError
 
 # Import local modules
-from config import get_settings
-from logger import get_logger
+from config import WhisperSettings, get_settings
+from logger import get_logger, stop_logger
 
-# Load environment variables
+# Load environment variables; .env never overrides the process environment,
+# including on reload. uvicorn imports this module again, and workers
+# inherit the loaded .env, so the first import records the real process
+# environment's keys in the environment itself.
+PROCESS_ENV_MARKER = "_WHISPER_PROCESS_ENV_KEYS"
+os.environ.setdefault(PROCESS_ENV_MARKER, json.dumps(sorted(os.environ)))
+PROCESS_ENV_KEYS = frozenset(json.loads(os.environ[PROCESS_ENV_MARKER]))
 load_dotenv()
 
 # Ensure logs directory exists
@@ -25,6 +42,103 @@ os.makedirs("logs", exist_ok=True)
 # Initialize logger
 logger = get_logger('whisper-service')
 
+# Whisper models take 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# Default CTranslate2 compute types per device. int8_float16 runs the
+# matmuls on INT8 tensor cores with int8 weights; float16 and float32
+# are fallbacks for GPUs without INT8 support.
+DEFAULT_COMPUTE_TYPES = {"cuda": "int8_float16", "cpu": "int8"}
+COMPUTE_TYPE_FALLBACKS = {"cuda": ("float16", "float32"), "cpu": ("float32",)}
+
+
+def resolve_compute_type(device: str, requested: str) -> str:
+    """Return the requested compute type, or the best fallback the device supports."""
+    supported = ctranslate2.get_supported_compute_types(device)
+    if requested in supported:
+        return requested
+    for compute_type in COMPUTE_TYPE_FALLBACKS[device]:
+        if compute_type in supported:
+            logger.warning(
+                "Compute type %s not supported on %s, using %s",
+                requested,
+                device,
+                compute_type,
+            )
+            return compute_type
+    return requested
+
+
+# Raw request bodies stay in memory up to this size before spilling to disk
+RAW_SPOOL_MAX_SIZE = 64 << 20
+
+# Output formats that need word-level timestamps
+WORD_TIMESTAMP_FORMATS = {"json": True}
+
+
+def _transcribe_options(settings: WhisperSettings) -> Dict[str, Any]:
+    """Decoding options passed to every transcription"""
+    return {
+        "beam_size": settings.beam_size,
+        "best_of": 5,
+        "temperature": settings.temperature,
+        "compression_ratio_threshold": 2.4,
+        "log_prob_threshold": -1.0,
+        "no_speech_threshold": settings.no_speech_threshold,
+        "condition_on_previous_text": settings.condition_on_previous_text,
+    }
+
+
+def log_cpu_int8_support() -> None:
+    """Log whether the CPU has VNNI int8 dot-product instructions
+
+    int8 runs on any x86_64 or ARM CPU; CTranslate2 picks the fastest
+    kernels itself, and VNNI (AVX512-VNNI / AVX-VNNI) is the fast path.
+    """
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as cpuinfo:
+            flags = next(
+                (line.split(":", 1)[1].split() for line in cpuinfo if line.startswith("flags")),
+                [],
+            )
+    except OSError:
+        return
+    if "avx512_vnni" in flags or "avx_vnni" in flags:
+        logger.info("CPU supports VNNI int8 instructions")
+    else:
+        logger.info("CPU has no VNNI; int8 uses CTranslate2's generic kernels")
+
+
+def _decode_file(file: BinaryIO) -> np.ndarray:
+    """Decode a file object from its start to 16 kHz mono samples
+
+    An upload that Starlette spooled to disk is opened by FFmpeg itself
+    through /proc/self/fd, so reads skip PyAV's Python file callbacks.
+    Uploads still held in memory are read through the file object.
+    """
+    # Same check Starlette uses; fileno() alone would force a rollover
+    if getattr(file, "_rolled", True) and os.path.isdir("/proc/self/fd"):
+        try:
+            fd = file.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            fd = None
+        if fd is not None:
+            # FFmpeg reads the fd directly, so buffered writes must reach it first
+            file.flush()
+            return decode_audio(f"/proc/self/fd/{fd}", sampling_rate=SAMPLE_RATE)
+
+    file.seek(0)
+    return decode_audio(file, sampling_rate=SAMPLE_RATE)
+
+
+def _format_timestamp(seconds: float, separator: str) -> str:
+    """Format seconds as HH:MM:SS<separator>mmm using integer milliseconds"""
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{milliseconds:03d}"
+
 
 class WhisperService:
     """High-performance Whisper transcription service with GPU acceleration"""
@@ -32,7 +146,24 @@ class WhisperService:
     def __init__(self) -> None:
         """Initialize WhisperService with automatic GPU detection and model settings."""
         self.model = None
-        self.model_size = os.getenv("WHISPER_MODEL_SIZE", "small")
+        settings = get_settings()
+        self.model_size = settings.model_size
+        self.cpu_threads = settings.cpu_threads
+        self.transcribe_options = _transcribe_options(settings)
+
+        # Model calls are queued and run back to back on one dedicated
+        # thread, so concurrent requests never contend for the model
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper-model")
+        self._worker: Optional[asyncio.Task] = None
+
+        # GPU weights move to host memory after idle_seconds without requests
+        self.idle_seconds = settings.idle_seconds
+        self.last_use = time.monotonic()
+        self._active = 0
+        self._offloaded = False
+        self._model_lock = asyncio.Lock()
+        self._idle_monitor: Optional[asyncio.Task] = None
         
         if torch.cuda.is_available():
             try:
@@ -40,34 +171,160 @@ class WhisperService:
                 test_tensor = torch.tensor([1.0], device="cuda")
                 del test_tensor
                 self.device = "cuda"
-                self.compute_type = "float16"
-                logger.info(f"CUDA available - using GPU")
-                logger.info(f"GPU: {torch.cuda.get_device_name(0)}")
+                logger.info("CUDA available - using GPU")
+                logger.info("GPU: %s", torch.cuda.get_device_name(0))
                 logger.info(
-                    f"VRAM: {torch.cuda.get_device_properties(0).total_memory / 1024**3:.1f} GB"
+                    "VRAM: %.1f GB",
+                    torch.cuda.get_device_properties(0).total_memory / 1024**3,
                 )
             except Exception as e:
-                logger.warning(f"CUDA test failed: {e}, falling back to CPU")
+                logger.warning("CUDA test failed: %s, falling back to CPU", e)
                 self.device = "cpu"
-                self.compute_type = "float32"
         else:
             self.device = "cpu"
-            self.compute_type = "float32"
-            
-        logger.info(f"Initializing Whisper service on {self.device}")
-        self._load_model()
+
+        self.compute_type = resolve_compute_type(
+            self.device,
+            settings.compute_type or DEFAULT_COMPUTE_TYPES[self.device],
+        )
+        if self.device == "cpu":
+            log_cpu_int8_support()
+
+        logger.info("Initializing Whisper service on %s", self.device)
+
+    def reload_settings(self) -> Dict[str, Any]:
+        """Re-read .env and apply new transcription options
+
+        The process environment can't change from outside, so new values
+        come from .env. As at startup, variables set in the process
+        environment take precedence over it. Model, device and server
+        settings only take effect on restart. Invalid values raise
+        ValidationError and leave the environment and current settings as
+        they were.
+        """
+        snapshot = dict(os.environ)
+        for key, value in dotenv_values().items():
+            if key not in PROCESS_ENV_KEYS and value is not None:
+                os.environ[key] = value
+        try:
+            settings = WhisperSettings()
+        except ValidationError:
+            os.environ.clear()
+            os.environ.update(snapshot)
+            raise
+        get_settings.cache_clear()
+        self.transcribe_options = _transcribe_options(settings)
+        logger.info("Transcription options reloaded: %s", self.transcribe_options)
+        return self.transcribe_options
+
+    async def start(self) -> None:
+        """Load the model on the model thread and start the queue worker"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._load_model)
+        self._worker = asyncio.create_task(self._process_queue())
+
+        # CTranslate2 can park weights in host memory and restore them in
+        # well under a second; other backends stay resident
+        self.last_use = time.monotonic()
+        if self.idle_seconds > 0 and self.device == "cuda" and isinstance(self.model, WhisperModel):
+            self._idle_monitor = asyncio.create_task(self._offload_when_idle())
+
+    async def stop(self) -> None:
+        """Stop the queue worker and release the model thread"""
+        for task in (self._idle_monitor, self._worker):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._idle_monitor = None
+        self._worker = None
+        self._executor.shutdown(wait=True)
+
+    async def _process_queue(self) -> None:
+        """Run queued model calls one after another on the model thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            func, future = await self._queue.get()
+            try:
+                if not future.done():
+                    result = await loop.run_in_executor(self._executor, func)
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _enqueue(self, func: Callable[[], Any]) -> Any:
+        """Queue a call for the model thread and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((func, future))
+        return await future
+
+    async def _submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a model call for a request, reloading offloaded weights first"""
+        self._active += 1
+        try:
+            await self._ensure_model()
+            return await self._enqueue(functools.partial(func, *args, **kwargs))
+        finally:
+            self._active -= 1
+            self.last_use = time.monotonic()
+
+    async def _ensure_model(self) -> None:
+        """Move offloaded model weights back onto the GPU"""
+        async with self._model_lock:
+            if self._offloaded:
+                logger.info("Reloading model weights onto %s", self.device)
+                await self._enqueue(self.model.model.load_model)
+                self._offloaded = False
+
+    async def _offload_when_idle(self) -> None:
+        """Move the model weights to host memory once no request has run for idle_seconds"""
+        while True:
+            remaining = self.last_use + self.idle_seconds - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+
+            async with self._model_lock:
+                idle = time.monotonic() - self.last_use >= self.idle_seconds
+                if idle and not self._offloaded and self._active == 0:
+                    logger.info("Idle for %ss, moving model weights to host memory", self.idle_seconds)
+                    await self._enqueue(
+                        functools.partial(self.model.model.unload_model, to_cpu=True)
+                    )
+                    self._offloaded = True
+            await asyncio.sleep(self.idle_seconds)
+
+    def _transcribe_sync(self, audio: np.ndarray, **options: Any) -> Tuple[List[Any], Any]:
+        """Transcribe to completion; segments are decoded as they are iterated"""
+        segments, info = self.model.transcribe(audio, **options)
+        return list(segments), info
 
     def _load_model(self) -> None:
         """Load the Whisper model with optimal settings"""
+        settings = get_settings()
+        if settings.backend == "transformers" or settings.speculative:
+            if self.device == "cuda" and self._load_hf_model(settings):
+                return
+            logger.warning("transformers backend unavailable, using faster-whisper")
+
         try:
             logger.info(
-                f"Loading {self.model_size} model on {self.device} with {self.compute_type}"
+                "Loading %s model on %s with %s",
+                self.model_size,
+                self.device,
+                self.compute_type,
             )
             self.model = WhisperModel(
                 self.model_size,
                 device=self.device,
                 compute_type=self.compute_type,
-                cpu_threads=4 if self.device == "cpu" else 1,
+                cpu_threads=self.cpu_threads if self.device == "cpu" else 1,
                 num_workers=1,
             )
             logger.info("Model loaded successfully")
@@ -76,27 +333,70 @@ class WhisperService:
                 logger.info("Testing GPU model functionality...")
                 
         except Exception as e:
-            logger.error(f"Failed to load model with {self.device}: {e}")
+            logger.error("Failed to load model with %s: %s", self.device, e)
+            if self.device == "cuda" and self.compute_type != "float16":
+                # INT8 kernels need tensor cores; older GPUs still run float16
+                logger.warning("Retrying GPU model with float16")
+                try:
+                    self.compute_type = "float16"
+                    self.model = WhisperModel(
+                        self.model_size,
+                        device="cuda",
+                        compute_type="float16",
+                        cpu_threads=1,
+                        num_workers=1,
+                    )
+                    logger.info("float16 GPU model loaded successfully")
+                    return
+                except Exception as fp16_error:
+                    logger.error("float16 GPU model also failed: %s", fp16_error)
             if self.device == "cuda":
                 logger.warning("GPU model failed, falling back to CPU")
                 try:
                     self.device = "cpu"
-                    self.compute_type = "float32"
+                    self.compute_type = resolve_compute_type("cpu", DEFAULT_COMPUTE_TYPES["cpu"])
+                    log_cpu_int8_support()
                     self.model = WhisperModel(
                         self.model_size,
                         device="cpu",
-                        compute_type="float32",
-                        cpu_threads=4,
+                        compute_type=self.compute_type,
+                        cpu_threads=self.cpu_threads,
                     )
                     logger.info("CPU fallback model loaded successfully")
                 except Exception as cpu_error:
-                    logger.error(f"CPU fallback also failed: {cpu_error}")
+                    logger.error("CPU fallback also failed: %s", cpu_error)
                     raise RuntimeError(
                         "Could not load Whisper model on either GPU or CPU"
                     )
             else:
                 raise
 
+    def _load_hf_model(self, settings: Any) -> bool:
+        """Load the transformers backend, with a distil-whisper assistant if speculative"""
+        try:
+            # transformers is only imported when this backend is enabled
+            from hf_backend import HFWhisperModel
+
+            self.model = HFWhisperModel(
+                settings.hf_model,
+                device=self.device,
+                assistant_id=settings.assistant_model if settings.speculative else None,
+                batch_size=settings.batch_size,
+                chunk_length_s=settings.chunk_length_s,
+                compile=settings.compile,
+                warmup_options=self.transcribe_options,
+            )
+            self.model_size = settings.hf_model
+            self.compute_type = "float16"
+            if settings.speculative:
+                logger.info("Speculative decoding enabled with %s", settings.assistant_model)
+            else:
+                logger.info("Batched transformers backend enabled, batch size %s", settings.batch_size)
+            return True
+        except Exception as e:
+            logger.error("Failed to load transformers backend: %s", e)
+            return False
+
     def cleanup_cuda_memory(self) -> None:
         """Cleanup CUDA memory and model resources"""
         try:
@@ -113,39 +413,46 @@ class WhisperService:
                 logger.info("CUDA memory cache cleared")
                 
         except Exception as e:
-            logger.error(f"Error during CUDA cleanup: {e}")
+            logger.error("Error during CUDA cleanup: %s", e)
+
+    async def _decode_upload(self, file: BinaryIO) -> np.ndarray:
+        """Decode an uploaded file to 16 kHz mono float32 samples
+
+        PyAV reads the upload's spooled file incrementally, so the encoded
+        audio is never copied into a bytes object. Decoding runs in a thread
+        to keep the event loop free.
+        """
+        return await asyncio.to_thread(_decode_file, file)
 
     async def transcribe_audio(
         self,
-        audio_file: UploadFile,
+        audio_file: BinaryIO,
         task: str = "transcribe",
         language: Optional[str] = None,
         initial_prompt: Optional[str] = None,
         output_format: str = "txt",
     ) -> Dict[str, Any]:
         """Transcribe audio file using faster-whisper"""
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-            
         try:
-            settings = get_settings()
-            whisper_config = settings.get_whisper_config()
-            
-            segments, info = self.model.transcribe(
-                temp_path,
+            audio = await self._decode_upload(audio_file)
+            word_timestamps = WORD_TIMESTAMP_FORMATS.get(output_format, False)
+
+            options = self.transcribe_options
+            if not isinstance(self.model, WhisperModel):
+                # Build the log-mel features here so the model thread only runs the model
+                features = await asyncio.to_thread(
+                    self.model.prepare, audio, language, word_timestamps
+                )
+                options = {**options, "features": features}
+
+            segments, info = await self._submit(
+                self._transcribe_sync,
+                audio,
                 task=task,
                 language=language,
                 initial_prompt=initial_prompt,
-                beam_size=whisper_config["beam_size"],
-                best_of=5,
-                temperature=whisper_config["temperature"],
-                compression_ratio_threshold=2.4,
-                log_prob_threshold=-1.0,
-                no_speech_threshold=whisper_config["no_speech_threshold"],
-                condition_on_previous_text=whisper_config["condition_on_previous_text"],
-                word_timestamps=True if output_format == "json" else False,
+                word_timestamps=word_timestamps,
+                **options,
             )
             
             if output_format == "json":
@@ -160,109 +467,113 @@ class WhisperService:
                 return {"text": " ".join(segment.text for segment in segments)}
                 
         except Exception as e:
-            logger.error(f"Transcription failed: {e}")
+            logger.error("Transcription failed: %s", e)
             raise HTTPException(
                 status_code=500, detail=f"Transcription failed: {str(e)}"
             )
-        finally:
-            try:
-                os.unlink(temp_path)
-            except OSError as e:
-                logger.debug(f"Failed to delete temporary file: {e}")
 
-    def _format_json_output(self, segments: List[Any], info: Any) -> Dict[str, Any]:
-        """Format output as JSON with detailed segment information"""
-        return {
-            "text": " ".join(segment.text for segment in segments),
-            "language": info.language,
-            "language_probability": info.language_probability,
-            "duration": info.duration,
-            "segments": [
+    def _format_json_output(self, segments: Iterable[Any], info: Any) -> Dict[str, Any]:
+        """Format output as JSON with detailed segment information
+
+        Text and segments are collected in one pass, so a one-shot segment
+        generator is consumed exactly once.
+        """
+        texts = []
+        formatted_segments = []
+        for i, segment in enumerate(segments):
+            texts.append(segment.text)
+            formatted_segments.append(
                 {
                     "id": i,
                     "start": segment.start,
                     "end": segment.end,
                     "text": segment.text,
-                    "words": (
-                        [
-                            {
-                                "word": word.word,
-                                "start": word.start,
-                                "end": word.end,
-                                "probability": word.probability,
-                            }
-                            for word in (segment.words or [])
-                        ]
-                        if segment.words
-                        else []
-                    ),
+                    "words": [
+                        {
+                            "word": word.word,
+                            "start": word.start,
+                            "end": word.end,
+                            "probability": word.probability,
+                        }
+                        for word in segment.words or ()
+                    ],
                 }
-                for i, segment in enumerate(segments)
-            ],
+            )
+
+        return {
+            "text": " ".join(texts),
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "duration": info.duration,
+            "segments": formatted_segments,
         }
 
-    def _format_vtt_output(self, segments: List[Any]) -> str:
-        """Format output as WebVTT"""
-        vtt_lines = ["WEBVTT", ""]
-        for segment in segments:
-            start_time = self._seconds_to_vtt_time(segment.start)
-            end_time = self._seconds_to_vtt_time(segment.end)
-            vtt_lines.append(f"{start_time} --> {end_time}")
-            vtt_lines.append(segment.text)
-            vtt_lines.append("")
-        return "\n".join(vtt_lines)
-
-    def _format_srt_output(self, segments: List[Any]) -> str:
-        """Format output as SRT"""
-        srt_lines = []
-        for i, segment in enumerate(segments, 1):
-            start_time = self._seconds_to_srt_time(segment.start)
-            end_time = self._seconds_to_srt_time(segment.end)
-            srt_lines.append(str(i))
-            srt_lines.append(f"{start_time} --> {end_time}")
-            srt_lines.append(segment.text)
-            srt_lines.append("")
-        return "\n".join(srt_lines)
+    def _format_vtt_output(self, segments: Iterable[Any]) -> str:
+        """Format output as WebVTT, joining lines generated from the segment list"""
+        vtt_time = self._seconds_to_vtt_time
+        return "\n".join(
+            itertools.chain(
+                ("WEBVTT", ""),
+                itertools.chain.from_iterable(
+                    (
+                        f"{vtt_time(segment.start)} --> {vtt_time(segment.end)}",
+                        segment.text,
+                        "",
+                    )
+                    for segment in segments
+                ),
+            )
+        )
+
+    def _format_srt_output(self, segments: Iterable[Any]) -> str:
+        """Format output as SRT, joining lines generated from the segment list"""
+        srt_time = self._seconds_to_srt_time
+        return "\n".join(
+            itertools.chain.from_iterable(
+                (
+                    str(i),
+                    f"{srt_time(segment.start)} --> {srt_time(segment.end)}",
+                    segment.text,
+                    "",
+                )
+                for i, segment in enumerate(segments, 1)
+            )
+        )
 
     def _seconds_to_vtt_time(self, seconds: float) -> str:
         """Convert seconds to VTT time format"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        seconds = seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+        return _format_timestamp(seconds, ".")
 
     def _seconds_to_srt_time(self, seconds: float) -> str:
         """Convert seconds to SRT time format"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        seconds = seconds % 60
-        milliseconds = int((seconds % 1) * 1000)
-        seconds = int(seconds)
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+        return _format_timestamp(seconds, ",")
 
     async def detect_language(self, audio_file: UploadFile) -> Dict[str, Any]:
         """Detect the language of the audio file"""
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-            
         try:
-            segments, info = self.model.transcribe(temp_path, beam_size=1, best_of=1)
+            audio = await self._decode_upload(audio_file.file)
+            if not isinstance(self.model, WhisperModel):
+                # The transformers backend decodes eagerly in transcribe
+                features = await asyncio.to_thread(self.model.prepare, audio)
+                language, probability = await self._submit(
+                    self.model.detect_language, audio, features=features
+                )
+                return {"detected_language": language, "language_probability": probability}
+
+            # faster-whisper detects the language before returning its lazy
+            # segment generator, so no segments need to be decoded
+            _segments, info = await self._submit(
+                self.model.transcribe, audio, beam_size=1, best_of=1
+            )
             return {
                 "detected_language": info.language,
                 "language_probability": info.language_probability,
             }
         except Exception as e:
-            logger.error(f"Language detection failed: {e}")
+            logger.error("Language detection failed: %s", e)
             raise HTTPException(
                 status_code=500, detail=f"Language detection failed: {str(e)}"
             )
-        finally:
-            try:
-                os.unlink(temp_path)
-            except OSError as e:
-                logger.debug(f"Failed to delete temporary file: {e}")
 
 
 # Initialize service and FastAPI app
@@ -271,14 +582,23 @@ app = FastAPI(
     title="Whisper ASR Service",
     description="High-performance speech recognition service with GPU acceleration",
     version="2.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 
+@app.on_event("startup")
+async def startup_event() -> None:
+    """Load the model and start processing requests"""
+    await whisper_service.start()
+
+
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     """Cleanup CUDA memory on service shutdown"""
     logger.info("Shutting down Whisper service, cleaning up CUDA memory...")
+    await whisper_service.stop()
     whisper_service.cleanup_cuda_memory()
+    stop_logger('whisper-service')
 
 
 @app.post("/asr")
@@ -289,7 +609,7 @@ async def transcribe(
     initial_prompt: Optional[str] = Query(None),
     output: Literal["txt", "vtt", "srt", "tsv", "json"] = Query("txt"),
     encode: bool = Query(True),
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """
     Transcribe audio file to text
     Compatible with the Docker whisper-asr-webservice API
@@ -303,35 +623,95 @@ async def transcribe(
     
     try:
         result = await whisper_service.transcribe_audio(
-            audio_file=audio_file,
+            audio_file=audio_file.file,
             task=task,
             language=language,
             initial_prompt=initial_prompt,
             output_format=output,
         )
-        return result
+        return ORJSONResponse(result)
     except Exception as e:
-        logger.error(f"Transcription error: {e}")
+        logger.error("Transcription error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/asr/raw")
+async def transcribe_raw(
+    request: Request,
+    task: Literal["transcribe", "translate"] = Query("transcribe"),
+    language: Optional[str] = Query(None),
+    initial_prompt: Optional[str] = Query(None),
+    output: Literal["txt", "vtt", "srt", "tsv", "json"] = Query("txt"),
+) -> ORJSONResponse:
+    """
+    Transcribe audio sent as the raw request body
+    Skips multipart parsing; the body is streamed into an in-memory spool
+    Bodies over WHISPER_MAX_BODY_MB are rejected with 413
+    """
+    max_bytes = get_settings().max_body_mb << 20
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="Audio body too large")
+
+    with tempfile.SpooledTemporaryFile(max_size=RAW_SPOOL_MAX_SIZE) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail="Audio body too large")
+            # The write that passes max_size rolls the spool over to disk;
+            # it and every later write run off the event loop
+            if size > RAW_SPOOL_MAX_SIZE:
+                await asyncio.to_thread(spool.write, chunk)
+            else:
+                spool.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty audio body")
+
+        try:
+            result = await whisper_service.transcribe_audio(
+                audio_file=spool,
+                task=task,
+                language=language,
+                initial_prompt=initial_prompt,
+                output_format=output,
+            )
+            return ORJSONResponse(result)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Transcription error: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/detect-language")
 async def detect_language(
     audio_file: UploadFile = File(...), encode: bool = Query(True)
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """Detect the language of an audio file"""
     try:
         result = await whisper_service.detect_language(audio_file)
-        return result
+        return ORJSONResponse(result)
     except Exception as e:
-        logger.error(f"Language detection error: {e}")
+        logger.error("Language detection error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/reload")
+async def reload_settings() -> ORJSONResponse:
+    """Reload transcription options from .env"""
+    try:
+        transcription = whisper_service.reload_settings()
+    except ValidationError as e:
+        logger.error("Settings reload rejected: %s", e)
+        raise HTTPException(status_code=422, detail=str(e))
+    return ORJSONResponse({"status": "reloaded", "transcription": transcription})
+
+
 @app.get("/health")
-async def health_check() -> Dict[str, Any]:
+async def health_check() -> ORJSONResponse:
     """Health check endpoint"""
-    return {
+    return ORJSONResponse({
         "status": "healthy",
         "device": whisper_service.device,
         "model_size": whisper_service.model_size,
@@ -339,13 +719,13 @@ async def health_check() -> Dict[str, Any]:
         "gpu_name": (
             torch.cuda.get_device_name(0) if torch.cuda.is_available() else None
         ),
-    }
+    })
 
 
 @app.get("/")
-async def root() -> Dict[str, Any]:
+async def root() -> ORJSONResponse:
     """Root endpoint with service information"""
-    return {
+    return ORJSONResponse({
         "service": "Whisper ASR Service",
         "version": "2.0.0",
         "device": whisper_service.device,
@@ -353,17 +733,33 @@ async def root() -> Dict[str, Any]:
         "gpu_acceleration": torch.cuda.is_available(),
         "endpoints": {
             "transcribe": "/asr",
+            "transcribe_raw": "/asr/raw",
             "detect_language": "/detect-language",
+            "reload": "/reload",
             "health": "/health",
             "docs": "/docs",
         },
-    }
+    })
 
 
 if __name__ == "__main__":
-    port = int(os.getenv("WHISPER_PORT", 9000))
-    host = os.getenv("WHISPER_HOST", "0.0.0.0")
-    logger.info(f"Starting Whisper service on {host}:{port}")
-    logger.info(f"Device: {whisper_service.device}")
-    logger.info(f"Model: {whisper_service.model_size}")
-    uvicorn.run(app, host=host, port=port, log_level="info", access_log=True)
+    settings = get_settings()
+    logger.info("Starting Whisper service on %s:%s", settings.host, settings.port)
+    logger.info("Device: %s", whisper_service.device)
+    logger.info("Model: %s", whisper_service.model_size)
+
+    # Each worker process loads its own model. One GPU model serves all
+    # requests through the queue; on CPU, workers split the cores.
+    workers = settings.workers or (
+        1 if whisper_service.device == "cuda"
+        else max(1, (os.cpu_count() or 1) // settings.cpu_threads)
+    )
+    logger.info("Workers: %s", workers)
+    uvicorn.run(
+        "service:app",
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        log_level="info",
+        access_log=True,
+    )
@@ -0,0 +1,197 @@
+"""
+Tests for the transformers backend's compile setup
+No weights are downloaded: model loading is either faked or returns a tiny
+randomly initialized Whisper with a byte-level tokenizer
+"""
+
+import copy
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("faster_whisper")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import hf_backend  # noqa: E402
+
+
+class FakeModel:
+    """Just enough of a Whisper model for HFWhisperModel.__init__"""
+
+    def __init__(self) -> None:
+        self.generation_config = transformers.GenerationConfig(
+            decoder_start_token_id=0, lang_to_id={"<|en|>": 1, "<|de|>": 2}
+        )
+        self.encoder = SimpleNamespace(forward=lambda *args, **kwargs: None)
+
+    def to(self, device: str) -> "FakeModel":
+        return self
+
+    def forward(self, *args, **kwargs) -> None:
+        return None
+
+    def get_encoder(self) -> SimpleNamespace:
+        return self.encoder
+
+
+def fake_pipeline(task, model, **kwargs) -> SimpleNamespace:
+    # Like transformers' pipeline, keep a copy of the model's generation config
+    return SimpleNamespace(generation_config=copy.deepcopy(model.generation_config))
+
+
+@pytest.fixture
+def fake_transformers(monkeypatch):
+    monkeypatch.setattr(
+        hf_backend.AutoModelForSpeechSeq2Seq, "from_pretrained", lambda *args, **kwargs: FakeModel()
+    )
+    monkeypatch.setattr(
+        hf_backend.AutoProcessor,
+        "from_pretrained",
+        lambda *args, **kwargs: SimpleNamespace(tokenizer=None, feature_extractor=None),
+    )
+    monkeypatch.setattr(hf_backend, "pipeline", fake_pipeline)
+    monkeypatch.setattr(hf_backend.torch, "compile", lambda fn, **kwargs: fn)
+
+
+def byte_characters() -> list:
+    """GPT-2's printable stand-ins for the 256 byte values"""
+    printable = [*range(ord("!"), ord("~") + 1), *range(ord("¡"), ord("¬") + 1), *range(ord("®"), ord("ÿ") + 1)]
+    others = [b for b in range(256) if b not in printable]
+    mapping = dict(zip(printable, printable))
+    mapping.update((b, 256 + i) for i, b in enumerate(others))
+    return [chr(mapping[b]) for b in range(256)]
+
+
+@pytest.fixture
+def tiny_transformers(monkeypatch, tmp_path):
+    """A tiny random Whisper and processor, compiled with the eager backend"""
+    specials = [
+        "<|endoftext|>", "<|startoftranscript|>", "<|en|>", "<|de|>", "<|translate|>",
+        "<|transcribe|>", "<|startoflm|>", "<|startofprev|>", "<|nospeech|>", "<|notimestamps|>",
+    ] + [f"<|{i * 0.02:.2f}|>" for i in range(1501)]
+    vocab = {char: i for i, char in enumerate(byte_characters())}
+    vocab.update((token, len(vocab) + i) for i, token in enumerate(specials))
+    (tmp_path / "vocab.json").write_text(json.dumps(vocab))
+    (tmp_path / "merges.txt").write_text("#version: 0.2\n")
+    tokenizer = transformers.WhisperTokenizer.from_pretrained(
+        str(tmp_path), pad_token="<|endoftext|>", additional_special_tokens=specials[1:]
+    )
+    processor = transformers.WhisperProcessor(
+        feature_extractor=transformers.WhisperFeatureExtractor(feature_size=80),
+        tokenizer=tokenizer,
+    )
+
+    special_ids = {
+        "decoder_start_token_id": vocab["<|startoftranscript|>"],
+        "eos_token_id": vocab["<|endoftext|>"],
+        "pad_token_id": vocab["<|endoftext|>"],
+        "bos_token_id": vocab["<|endoftext|>"],
+    }
+    config = transformers.WhisperConfig(
+        vocab_size=len(vocab), d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=32, decoder_ffn_dim=32, **special_ids,
+    )
+    torch.manual_seed(0)
+    model = transformers.WhisperForConditionalGeneration(config).eval()
+    model.generation_config = transformers.GenerationConfig(
+        lang_to_id={"<|en|>": vocab["<|en|>"], "<|de|>": vocab["<|de|>"]},
+        task_to_id={"transcribe": vocab["<|transcribe|>"], "translate": vocab["<|translate|>"]},
+        no_timestamps_token_id=vocab["<|notimestamps|>"],
+        prev_sot_token_id=vocab["<|startofprev|>"],
+        is_multilingual=True,
+        alignment_heads=[[0, 0], [0, 1]],
+        max_initial_timestamp_index=50,
+        max_length=config.max_target_positions,
+        **special_ids,
+    )
+
+    monkeypatch.setattr(
+        hf_backend.AutoModelForSpeechSeq2Seq, "from_pretrained", lambda *args, **kwargs: model
+    )
+    monkeypatch.setattr(
+        hf_backend.AutoProcessor, "from_pretrained", lambda *args, **kwargs: processor
+    )
+    # Inductor and CUDA graphs need a compiler and a GPU; eager still traces
+    # with dynamo, so graph breaks and recompiles behave as in production
+    compile = torch.compile
+    monkeypatch.setattr(
+        hf_backend.torch, "compile",
+        lambda fn, mode=None, **kwargs: compile(fn, backend="eager", **kwargs),
+    )
+    # Warmup raises dynamo's recompile limit process-wide
+    monkeypatch.setattr(torch._dynamo.config, "cache_size_limit", torch._dynamo.config.cache_size_limit)
+    torch._dynamo.reset()
+    yield
+    torch._dynamo.reset()
+
+
+def test_pipeline_generation_config_uses_static_cache(fake_transformers, monkeypatch):
+    monkeypatch.setattr(hf_backend.HFWhisperModel, "_compile", lambda self, options: None)
+
+    model = hf_backend.HFWhisperModel("whisper", device="cpu", batch_size=4, compile=True)
+
+    generation_config = model.pipe.generation_config
+    assert generation_config.cache_implementation == "static"
+    assert generation_config.max_new_tokens == hf_backend.STATIC_CACHE_NEW_TOKENS
+
+
+def test_compile_warmup_runs_on_a_real_model(tiny_transformers):
+    model = hf_backend.HFWhisperModel("whisper", device="cpu", batch_size=2, compile=True)
+
+    audio = np.zeros(45 * hf_backend.SAMPLE_RATE, dtype=np.float32)
+    segments, info = model.transcribe(audio, language="en", word_timestamps=True)
+    list(segments)
+    assert info.language == "en"
+
+
+def test_compile_warms_up_full_and_power_of_two_batch_sizes(tiny_transformers, monkeypatch):
+    calls = []
+    run_pipeline = hf_backend.HFWhisperModel._run_pipeline
+
+    def record(self, inputs, return_timestamps, generate_kwargs):
+        calls.append((len(inputs), return_timestamps))
+        return run_pipeline(self, inputs, return_timestamps, generate_kwargs)
+
+    monkeypatch.setattr(hf_backend.HFWhisperModel, "_run_pipeline", record)
+
+    hf_backend.HFWhisperModel("whisper", device="cpu", batch_size=3, compile=True)
+
+    expected = {(size, mode) for size in (1, 2, 3) for mode in (True, "word")}
+    assert set(calls) == expected
+    assert torch._dynamo.config.cache_size_limit >= 16 * 3
+
+
+def test_long_initial_prompt_fits_the_static_cache(tiny_transformers):
+    model = hf_backend.HFWhisperModel("whisper", device="cpu", batch_size=1, compile=True)
+
+    audio = np.zeros(5 * hf_backend.SAMPLE_RATE, dtype=np.float32)
+    segments, _info = model.transcribe(audio, language="en", initial_prompt="hello " * 200)
+    list(segments)
+
+
+@pytest.mark.parametrize("seconds", [5, 45])
+def test_beam_size_and_temperature_reach_generate(tiny_transformers, monkeypatch, seconds):
+    model = hf_backend.HFWhisperModel("whisper", device="cpu", batch_size=2)
+    calls = []
+    generate = model.model.generate
+
+    def record(*args, **kwargs):
+        calls.append(kwargs)
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(model.model, "generate", record)
+
+    audio = np.zeros(seconds * hf_backend.SAMPLE_RATE, dtype=np.float32)
+    segments, _info = model.transcribe(audio, language="en", beam_size=3, temperature=(0.0, 0.2))
+    list(segments)
+
+    assert calls
+    assert all(call["num_beams"] == 3 and call["temperature"] == (0.0, 0.2) for call in calls)
@@ -0,0 +1,87 @@
+"""
+Tests for reloading transcription settings from .env through /reload
+The service module is imported without starting it, so no model is loaded
+"""
+
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("faster_whisper")
+dotenv = pytest.importorskip("dotenv")
+testclient = pytest.importorskip("fastapi.testclient")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import config  # noqa: E402
+
+
+@pytest.fixture
+def env_file(monkeypatch, tmp_path):
+    """A .env read by the service in place of the one next to service.py"""
+    path = tmp_path / ".env"
+    path.write_text("WHISPER_BEAM_SIZE=2\n")
+    load_dotenv, dotenv_values = dotenv.load_dotenv, dotenv.dotenv_values
+    monkeypatch.setattr(dotenv, "load_dotenv", lambda: load_dotenv(path))
+    monkeypatch.setattr(dotenv, "dotenv_values", lambda: dotenv_values(path))
+    monkeypatch.chdir(tmp_path)
+
+    environ = dict(os.environ)
+    for key in ("_WHISPER_PROCESS_ENV_KEYS", "WHISPER_BEAM_SIZE"):
+        os.environ.pop(key, None)
+    config.get_settings.cache_clear()
+    yield path
+    os.environ.clear()
+    os.environ.update(environ)
+    config.get_settings.cache_clear()
+    sys.modules.pop("service", None)
+
+
+def import_service():
+    """Import service.py afresh, as running it and then uvicorn.run() both do"""
+    sys.modules.pop("service", None)
+    return importlib.import_module("service")
+
+
+def reload(service):
+    return testclient.TestClient(service.app).post("/reload")
+
+
+def test_reload_applies_env_file_edits_after_uvicorn_reimport(env_file):
+    import_service()
+    service = import_service()
+    assert service.whisper_service.transcribe_options["beam_size"] == 2
+
+    env_file.write_text("WHISPER_BEAM_SIZE=3\n")
+    response = reload(service)
+
+    assert response.status_code == 200
+    assert response.json()["transcription"]["beam_size"] == 3
+
+
+def test_process_environment_takes_precedence_over_env_file(env_file):
+    os.environ["WHISPER_BEAM_SIZE"] = "4"
+    import_service()
+    service = import_service()
+
+    env_file.write_text("WHISPER_BEAM_SIZE=3\n")
+    response = reload(service)
+
+    assert response.status_code == 200
+    assert response.json()["transcription"]["beam_size"] == 4
+
+
+def test_reload_rejects_invalid_values_and_keeps_settings(env_file):
+    service = import_service()
+
+    env_file.write_text("WHISPER_BEAM_SIZE=notanint\n")
+    response = reload(service)
+
+    assert response.status_code == 422
+    assert os.environ["WHISPER_BEAM_SIZE"] == "2"
+    assert service.get_settings().beam_size == 2
+    assert service.whisper_service.transcribe_options["beam_size"] == 2